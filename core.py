@@ -1,17 +1,22 @@
 from __future__ import annotations
 
+import atexit
 import io
 import re
+from concurrent.futures import ThreadPoolExecutor, wait
 from enum import Enum
+from functools import lru_cache, partial
 from pathlib import Path
+from queue import Queue
 from shutil import which
+from threading import Lock, Thread, local
 from typing import NamedTuple, Callable, Any
+from urllib.parse import urlsplit, parse_qs
 
 import yt_dlp as youtube_dl
 from PIL import Image
 # noinspection PyProtectedMember
-from mutagen.id3 import ID3, APIC
-from mutagen.easyid3 import EasyID3
+from mutagen.id3 import ID3, APIC, TALB, TIT2, TPE1
 
 FFMPEG_COMMAND = 'ffmpeg'
 YOUTUBE_DL_COMMAND = 'yt-dlp'
@@ -26,11 +31,47 @@ VIDEO_URL_REGEX_STR = \
 VIDEO_URL_REGEX = re.compile(pattern=VIDEO_URL_REGEX_STR)
 
 
+SHORT_VIDEO_URL_HOST = 'youtu.be'
+VIDEO_URL_HOSTS = frozenset(('youtube.com', 'www.youtube.com'))
+VIDEO_ID_PATH_PREFIXES = frozenset(('v', 'embed'))
+VIDEO_ID_REGEX = re.compile(r'[A-Za-z0-9_-]+')
+
+
 def get_video_id(url: str) -> str | None:
-    if match := VIDEO_URL_REGEX.fullmatch(url):
-        return match.group(1)
+    if not url or any(c.isspace() for c in url):
+        return None
+
+    try:
+        scheme, host, path, query, _ = urlsplit(url)
+    except ValueError:
+        return None
+
+    if scheme not in ('http', 'https'):
+        return None
+
+    video_id = None
+
+    if host == SHORT_VIDEO_URL_HOST:
+        video_id = path[1:].split('/', 1)[0]
+    elif host in VIDEO_URL_HOSTS:
+        segments = path.split('/')[1:]
+
+        if path == '/watch':
+            video_id = parse_qs(query).get('v', [None])[0]
+        elif len(segments) > 1 and segments[0] in VIDEO_ID_PATH_PREFIXES:
+            video_id = segments[1]
+        elif segments[:1] == ['user'] and (match := VIDEO_URL_REGEX.fullmatch(url)):
+            video_id = match.group(1)
 
-    return None
+    # The id becomes a file name, reject anything outside YouTube's id alphabet (e.g. decoded '../')
+    if video_id is None or not VIDEO_ID_REGEX.fullmatch(video_id):
+        return None
+
+    return video_id
+
+
+def get_video_ids(text: str) -> list[str]:
+    return list(dict.fromkeys(filter(None, map(get_video_id, text.split()))))
 
 
 class YouTubeDLProgressKey(str, Enum):
@@ -52,6 +93,11 @@ class YouTubeDLProgress(NamedTuple):
     completion_percentage: str | None
 
 
+class DownloadedAudio(NamedTuple):
+    mp3: Path
+    thumbnail: Path | None
+
+
 class DiscardLogger:
     def info(self, _) -> None:
         pass
@@ -66,21 +112,50 @@ class DiscardLogger:
         pass
 
 
-def download_audio(
-        video_id: str,
-        download_folder: Path,
-        on_progress_changed: Callable[[YouTubeDLProgress], Any | None]
-) -> Path:
-    codec = 'mp3'
-    mp3_path = download_folder / f'{video_id}.{codec}'
+DEFAULT_CONCURRENT_FRAGMENTS = 4
+HTTP_CHUNK_SIZE = 10 * 1024 * 1024
 
-    def progress_hook(progress: dict[str, str | int | float]) -> None:
-        on_progress_changed(
-            YouTubeDLProgress(
-                status=YouTubeDLStatus(progress.get(YouTubeDLProgressKey.STATUS)),
-                completion_percentage=progress.get(YouTubeDLProgressKey.PERCENT)
-            )
-        )
+
+def get_concurrent_fragments(value: Any) -> int:
+    if isinstance(value, int) and not isinstance(value, bool) and value > 0:
+        return value
+
+    return DEFAULT_CONCURRENT_FRAGMENTS
+
+
+_youtube_dl_instances = local()
+_open_youtube_dls: set[youtube_dl.YoutubeDL] = set()
+_open_youtube_dls_lock = Lock()
+
+
+def _close_youtube_dl(ydl: youtube_dl.YoutubeDL) -> None:
+    with _open_youtube_dls_lock:
+        _open_youtube_dls.discard(ydl)
+
+    ydl.__exit__(None, None, None)
+
+
+def _get_youtube_dl(download_folder: Path, codec: str, concurrent_fragments: int) -> youtube_dl.YoutubeDL:
+    """
+    Get a YoutubeDL instance for given options, creating it on first use.
+
+    Each thread keeps only its most recently used instance: creating one is expensive, and
+    an instance can not be shared between concurrent downloads. The cached instance is
+    exited when the options change or when the program shuts down. Download threads are
+    long-lived (see _get_download_executor), so instances are reused across batches.
+    """
+    key = (download_folder, codec, concurrent_fragments)
+
+    cached: tuple[tuple[Path, str, int], youtube_dl.YoutubeDL] | None = \
+        getattr(_youtube_dl_instances, 'cached', None)
+
+    if cached is not None:
+        cached_key, ydl = cached
+        if cached_key == key:
+            return ydl
+
+        _youtube_dl_instances.cached = None
+        _close_youtube_dl(ydl)
 
     ydl_opts = {
         'format': 'bestaudio/best',
@@ -92,106 +167,145 @@ def download_audio(
             },
             {
                 'key': 'FFmpegMetadata'
-            },
-            {
-                'key': 'EmbedThumbnail',
-                'already_have_thumbnail': False
             }
         ],
         'addmetadata': True,
         'logger': DiscardLogger(),
-        'progress_hooks': [progress_hook],
         'writethumbnail': True,
-        'outtmpl': f'{download_folder}\\%(id)s.%(ext)s',
+        'concurrent_fragment_downloads': concurrent_fragments,
+        'http_chunk_size': HTTP_CHUNK_SIZE,
+        'outtmpl': str(download_folder / '%(id)s.%(ext)s'),
         'quiet': True
     }
 
+    ydl = youtube_dl.YoutubeDL(ydl_opts).__enter__()
+    with _open_youtube_dls_lock:
+        _open_youtube_dls.add(ydl)
+
+    _youtube_dl_instances.cached = (key, ydl)
+    return ydl
+
+
+def download_audio(
+        video_id: str,
+        download_folder: Path,
+        on_progress_changed: Callable[[YouTubeDLProgress], Any | None],
+        concurrent_fragments: int = DEFAULT_CONCURRENT_FRAGMENTS
+) -> DownloadedAudio:
+    codec = 'mp3'
+    mp3_path = download_folder / f'{video_id}.{codec}'
+
+    def progress_hook(progress: dict[str, str | int | float]) -> None:
+        on_progress_changed(
+            YouTubeDLProgress(
+                status=YouTubeDLStatus(progress.get(YouTubeDLProgressKey.STATUS)),
+                completion_percentage=progress.get(YouTubeDLProgressKey.PERCENT)
+            )
+        )
+
+    ydl = _get_youtube_dl(download_folder, codec, concurrent_fragments)
+
     try:
-        with youtube_dl.YoutubeDL(ydl_opts) as ydl:
-            ydl.download([f'https://www.youtube.com/watch?v={video_id}'])
+        ydl.add_progress_hook(progress_hook)
+        try:
+            info = ydl.extract_info(f'https://www.youtube.com/watch?v={video_id}')
+        finally:
+            # noinspection PyProtectedMember
+            ydl._progress_hooks.remove(progress_hook)
+
+        thumbnail_path = next(
+            (Path(thumbnail['filepath']) for thumbnail in info.get('thumbnails') or () if 'filepath' in thumbnail),
+            None
+        )
 
-        return mp3_path
+        return DownloadedAudio(mp3=mp3_path, thumbnail=thumbnail_path)
     except Exception:
         mp3_path.unlink(missing_ok=True)
 
         raise
 
 
-def crop_thumbnail(mp3: Path, thumbnail_size: (int, int) = (512, 512)) -> None:
-    id3 = ID3(str(mp3))
+@lru_cache(maxsize=256)
+def _title_cleanup_regex(artist: str) -> re.Pattern[str]:
+    return re.compile(re.escape(artist) + r'\s+.+?\s+')
 
-    key_album_cover = 'APIC'
-    album_cover_frame = None
 
-    for key in id3:
-        if key_album_cover in key:
-            album_cover_frame = id3[key]
-            break
+def make_album_cover(thumbnail: Path, thumbnail_size: (int, int) = (512, 512)) -> bytes:
+    with Image.open(thumbnail) as album_cover:
+        # Only the header has been read so far
+        width, height = album_cover.size
 
-    if album_cover_frame is None:
-        return
+        if album_cover.format == 'JPEG' and width == height \
+                and width <= thumbnail_size[0] and height <= thumbnail_size[1]:
+            return thumbnail.read_bytes()
+
+        # Let the JPEG decoder shrink the image while decoding (DCT scaling)
+        # instead of decoding it at full size and cropping afterwards
+        album_cover.draft(None, (width * thumbnail_size[1] // height, thumbnail_size[1]))
 
-    with (
-        io.BytesIO(album_cover_frame.data) as image_data_io,
-        Image.open(image_data_io) as album_cover
-    ):
         width, height = album_cover.size
         center = width // 2
         width, height = height, height
         album_cover = album_cover.crop(box=(center - width // 2, 0, center + width // 2, height))
         album_cover.thumbnail(size=thumbnail_size)
+        if album_cover.mode != 'RGB':
+            album_cover = album_cover.convert('RGB')
 
-        image_data_io.seek(0)
-        album_cover.save(image_data_io, format='jpeg')
-        image_data_io.truncate()
-        image_data_io.seek(0)
-        image_data = image_data_io.read()
-
-    id3[key_album_cover] = APIC(
-        encoding=3,
-        mime='image/jpeg',
-        type=3,
-        desc=u'Cover',
-        data=image_data
-    )
-
-    id3.save(mp3, v2_version=3)
+        with io.BytesIO() as image_data_io:
+            album_cover.save(image_data_io, format='jpeg', quality=90, optimize=True)
+            return image_data_io.getvalue()
 
 
-def cleanup_metadata(
+def finalize_mp3(
         mp3: Path,
+        thumbnail: Path | None,
         title: str | None = None,
         artist: str | None = None,
-        album: str | None = None
+        album: str | None = None,
+        thumbnail_size: (int, int) = (512, 512)
 ) -> tuple[str, str]:
-    id3 = EasyID3(str(mp3))
+    id3 = ID3(str(mp3))
 
-    key_album = 'album'
-    key_title = 'title'
-    key_artist = 'artist'
+    key_album_cover = 'APIC'
+    key_album = 'TALB'
+    key_title = 'TIT2'
+    key_artist = 'TPE1'
+
+    if thumbnail is not None:
+        image_data = make_album_cover(thumbnail, thumbnail_size)
+
+        id3.delall(key_album_cover)
+        id3.add(APIC(
+            encoding=3,
+            mime='image/jpeg',
+            type=3,
+            desc=u'Cover',
+            data=image_data
+        ))
+
+    title: str = title if title is not None else id3[key_title].text[0]
+    artist: str = artist if artist is not None else id3[key_artist].text[0]
+    album: str = album if album is not None else id3[key_album].text[0] if key_album in id3 else None
+
+    title = _title_cleanup_regex(artist).sub('', title)
+    id3[key_title] = TIT2(encoding=3, text=title)
+    id3[key_artist] = TPE1(encoding=3, text=artist)
+    id3[key_album] = TALB(encoding=3, text=title if not album else album)
 
-    title: str = title if title is not None else id3[key_title][0]
-    artist: str = artist if artist is not None else id3[key_artist][0]
-    album: str = album if album is not None else id3.get(key_album, [None])[0]
+    id3.save(mp3, v2_version=3)
 
-    title = re.sub(rf'{artist}\s+.+?\s+', '', title)
-    id3[key_title] = title
-    id3[key_artist] = artist
-    id3[key_album] = title if not album else album
+    if thumbnail is not None:
+        thumbnail.unlink(missing_ok=True)
 
-    id3.save(str(mp3))
     return title, artist
 
 
-def download(
+def stage_download(
         video_id: str,
         download_folder: Path,
         status_changed: Callable[[str], Any | None],
-        return_title_and_artist: bool = False,
-        overwrite_title: str | None = None,
-        overwrite_artist: str | None = None,
-        overwrite_album: str | None = None
-) -> Path | tuple[Path, str, str]:
+        concurrent_fragments: int = DEFAULT_CONCURRENT_FRAGMENTS
+) -> DownloadedAudio:
     def youtube_dl_progress_changed(progress: YouTubeDLProgress) -> None:
         if progress.status is YouTubeDLStatus.DOWNLOADING:
             status_changed(f'Downloading {progress.completion_percentage}')
@@ -201,25 +315,193 @@ def download(
             status_changed(f'Error occurred')
 
     status_changed(f'Starting download')
-    mp3_path = download_audio(video_id, download_folder, on_progress_changed=youtube_dl_progress_changed)
+    return download_audio(
+        video_id,
+        download_folder,
+        on_progress_changed=youtube_dl_progress_changed,
+        concurrent_fragments=concurrent_fragments
+    )
 
+
+def stage_postprocess(
+        audio: DownloadedAudio,
+        status_changed: Callable[[str], Any | None],
+        overwrite_title: str | None = None,
+        overwrite_artist: str | None = None,
+        overwrite_album: str | None = None
+) -> tuple[str, str]:
     try:
-        status_changed(f'Cropping thumbnail')
-        crop_thumbnail(mp3_path)
-        status_changed(f'Cleaning up metadata')
-        title, artist = cleanup_metadata(
-            mp3_path,
+        status_changed(f'Embedding thumbnail and cleaning up metadata')
+        title, artist = finalize_mp3(
+            audio.mp3,
+            audio.thumbnail,
             title=overwrite_title,
             artist=overwrite_artist,
             album=overwrite_album
         )
         status_changed(f'Finished')
 
-        if return_title_and_artist:
-            return mp3_path, title, artist
-
-        return mp3_path
+        return title, artist
     except Exception:
-        mp3_path.unlink(missing_ok=True)
+        audio.mp3.unlink(missing_ok=True)
+        if audio.thumbnail is not None:
+            audio.thumbnail.unlink(missing_ok=True)
 
         raise
+
+
+def download(
+        video_id: str,
+        download_folder: Path,
+        status_changed: Callable[[str], Any | None],
+        return_title_and_artist: bool = False,
+        overwrite_title: str | None = None,
+        overwrite_artist: str | None = None,
+        overwrite_album: str | None = None,
+        concurrent_fragments: int = DEFAULT_CONCURRENT_FRAGMENTS
+) -> Path | tuple[Path, str, str]:
+    audio = stage_download(video_id, download_folder, status_changed, concurrent_fragments)
+    title, artist = stage_postprocess(
+        audio,
+        status_changed,
+        overwrite_title=overwrite_title,
+        overwrite_artist=overwrite_artist,
+        overwrite_album=overwrite_album
+    )
+
+    if return_title_and_artist:
+        return audio.mp3, title, artist
+
+    return audio.mp3
+
+
+class DownloadBatchError(Exception):
+    def __init__(self, errors: dict[str, Exception], mp3_paths: list[Path], total: int) -> None:
+        """
+        :param errors: Exception raised for each failed video, keyed by video id.
+        :param mp3_paths: Files of the videos that were downloaded successfully.
+        :param total: Number of videos in the batch.
+        """
+        self.errors = errors
+        self.mp3_paths = mp3_paths
+
+        details = '\n'.join(f'{video_id}: {error}' for video_id, error in errors.items())
+        super().__init__(f'{len(errors)} of {total} downloads failed:\n{details}')
+
+
+MAX_PARALLEL_DOWNLOADS = 4
+
+_download_executors: dict[int, ThreadPoolExecutor] = {}
+_download_executors_lock = Lock()
+
+
+def _get_download_executor(max_workers: int) -> ThreadPoolExecutor:
+    with _download_executors_lock:
+        if (executor := _download_executors.get(max_workers)) is None:
+            executor = _download_executors[max_workers] = ThreadPoolExecutor(
+                max_workers=max_workers,
+                thread_name_prefix='download'
+            )
+
+        return executor
+
+
+@atexit.register
+def _shutdown_downloads() -> None:
+    with _download_executors_lock:
+        for executor in _download_executors.values():
+            executor.shutdown(wait=True)
+
+    with _open_youtube_dls_lock:
+        open_youtube_dls = list(_open_youtube_dls)
+
+    for ydl in open_youtube_dls:
+        _close_youtube_dl(ydl)
+
+
+def download_many(
+        video_ids: list[str],
+        download_folder: Path,
+        status_changed: Callable[[str], Any | None],
+        max_workers: int = MAX_PARALLEL_DOWNLOADS,
+        concurrent_fragments: int = DEFAULT_CONCURRENT_FRAGMENTS
+) -> list[Path]:
+    """
+    Download several videos, overlapping network-bound downloads with CPU-bound postprocessing.
+
+    Downloads run on a pool of max_workers threads and hand finished files over to a single
+    postprocessing thread through a queue. Each download fetches up to concurrent_fragments
+    fragments of a DASH/HLS stream at once.
+
+    :raises DownloadBatchError: If any of the videos failed to download or postprocess,
+        carries the errors by video id and the files of the videos that succeeded.
+    """
+    statuses = dict.fromkeys(video_ids, 'Queued')
+    statuses_lock = Lock()
+
+    def video_status_changed(video_id: str, new_status: str) -> None:
+        with statuses_lock:
+            statuses[video_id] = new_status
+
+            if 1 == len(statuses):
+                status_changed(new_status)
+            else:
+                status_changed('\n'.join(f'{key}: {value}' for key, value in statuses.items()))
+
+    download_queue: Queue[tuple[str, DownloadedAudio] | None] = Queue()
+    mp3_paths: dict[str, Path] = {}
+    errors: dict[str, Exception] = {}
+
+    def postprocess() -> None:
+        while (item := download_queue.get()) is not None:
+            video_id, audio = item
+
+            # noinspection PyBroadException
+            try:
+                stage_postprocess(audio, partial(video_status_changed, video_id))
+                mp3_paths[video_id] = audio.mp3
+            except Exception as exception:
+                video_status_changed(video_id, 'Error occurred')
+                errors[video_id] = exception
+
+    def download_and_enqueue(video_id: str) -> None:
+        try:
+            audio = stage_download(
+                video_id,
+                download_folder,
+                partial(video_status_changed, video_id),
+                concurrent_fragments
+            )
+        except Exception:
+            video_status_changed(video_id, 'Error occurred')
+            raise
+
+        video_status_changed(video_id, 'Waiting for postprocessing')
+        download_queue.put((video_id, audio))
+
+    postprocessor = Thread(target=postprocess)
+    postprocessor.start()
+
+    executor = _get_download_executor(max_workers)
+
+    try:
+        futures = [executor.submit(download_and_enqueue, video_id) for video_id in statuses]
+        wait(futures)
+    finally:
+        download_queue.put(None)
+        postprocessor.join()
+
+    for video_id, future in zip(statuses, futures):
+        if (exception := future.exception()) is not None:
+            errors[video_id] = exception
+
+    downloaded = [mp3_paths[video_id] for video_id in statuses if video_id in mp3_paths]
+
+    if errors:
+        raise DownloadBatchError(
+            errors={video_id: errors[video_id] for video_id in statuses if video_id in errors},
+            mp3_paths=downloaded,
+            total=len(statuses)
+        )
+
+    return downloaded
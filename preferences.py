@@ -1,30 +1,72 @@
-import json
+import atexit
+import os
 from pathlib import Path
+from threading import Lock, Timer
 from typing import Any
 
+try:
+    from orjson import dumps, loads
+except ImportError:
+    import json
+
+    loads = json.loads
+
+    def dumps(obj: Any) -> bytes:
+        return json.dumps(obj).encode('utf-8')
+
 
 class Preferences:
+    FLUSH_DELAY_SECONDS = 0.5
+
     def __init__(self, path: Path) -> None:
         self._path = path
 
         self._config: dict[str, Any] = {}
 
+        self._dirty = False
+        self._flush_timer: Timer | None = None
+        self._lock = Lock()
+
         try:
             self._update()
         except FileNotFoundError:
             pass
 
+        atexit.register(self._flush_now)
+
     def _update(self) -> None:
-        with self._path.open(mode='rt', encoding='utf-8') as config_file:
-            self._config: dict[str, Any] = json.load(config_file)
+        self._config: dict[str, Any] = loads(self._path.read_bytes())
 
     def _flush(self) -> None:
-        with self._path.open(mode='wt', encoding='utf-8') as config_file:
-            json.dump(self._config, config_file)
+        tmp_path = self._path.with_suffix('.json.tmp')
+        tmp_path.write_bytes(dumps(self._config))
+        os.replace(tmp_path, self._path)
+
+    def _flush_now(self) -> None:
+        with self._lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+
+            if not self._dirty:
+                return
+
+            self._flush()
+            self._dirty = False
+
+    def _schedule_flush(self) -> None:
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+
+        self._flush_timer = Timer(self.FLUSH_DELAY_SECONDS, self._flush_now)
+        self._flush_timer.daemon = True
+        self._flush_timer.start()
 
     def get(self, key: str, default: Any) -> Any:
         return self._config.get(key, default)
 
     def set(self, key: str, value: Any) -> None:
-        self._config[key] = value
-        self._flush()
+        with self._lock:
+            self._config[key] = value
+            self._dirty = True
+            self._schedule_flush()
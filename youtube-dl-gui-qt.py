@@ -8,18 +8,20 @@ import subprocess
 
 from PyQt6.QtCore import (
     Qt,
-    QRegularExpression,
     QRunnable,
     pyqtSignal as Signal,
     QThreadPool,
+    QTimer,
+    QUrl,
     pyqtSlot as Slot, QObject,
 )
-from PyQt6.QtGui import QIcon, QRegularExpressionValidator, QKeyEvent
+from PyQt6.QtGui import QIcon, QKeyEvent, QDesktopServices
 from PyQt6.QtWidgets import (
     QApplication,
     QMainWindow,
     QLabel,
     QLineEdit,
+    QPlainTextEdit,
     QFormLayout,
     QWidget,
     QHBoxLayout,
@@ -30,12 +32,21 @@ from PyQt6.QtWidgets import (
 )
 import qt_material
 
-from core import VIDEO_URL_REGEX_STR, VIDEO_URL_REGEX, get_video_id, download
+from core import DownloadBatchError, get_concurrent_fragments, get_video_ids, download_many
 from preferences import Preferences
 
 
 def show_file_in_explorer(path: Path) -> None:
-    subprocess.Popen(rf'explorer /select,"{path}"')
+    # explorer does not parse a quoted "/select,<path>" argument, keep the switch and the path separate
+    subprocess.Popen(['explorer', '/select,', str(path)], close_fds=True)
+
+
+def show_files_in_explorer(paths: list[Path]) -> None:
+    if 1 == len(paths):
+        show_file_in_explorer(paths[0])
+        return
+
+    QDesktopServices.openUrl(QUrl.fromLocalFile(str(paths[0].parent)))
 
 
 class BackgroundWorkProgress(QObject):
@@ -58,16 +69,32 @@ class BackgroundWorker(QRunnable):
 
 
 class MainWindow(QMainWindow):
+    URL_VALIDATION_DELAY_MS = 100
+
     status_changed = Signal(str)
+    files_downloaded = Signal(list)
+
+    KEY_CONCURRENT_FRAGMENTS = 'concurrent_fragments'
 
     def __init__(self, preferences: Preferences) -> None:
         super().__init__()
 
+        self._preferences = preferences
+
+        self.video_ids: list[str] = []
+
+        self._url_validation_timer = QTimer(self)
+        self._url_validation_timer.setSingleShot(True)
+        self._url_validation_timer.setInterval(self.URL_VALIDATION_DELAY_MS)
+        self._url_validation_timer.timeout.connect(self.validate_urls)
+
+        # Runs one batch at a time, download_many bounds the number of parallel downloads itself
+        self._download_pool = QThreadPool(self)
+        self._download_pool.setMaxThreadCount(1)
+
         self._setup_ui()
         self.reset_status()
 
-        self.video_id: str | None = None
-
         key_download_folder = 'download_folder'
         self.download_folder_input.setText(preferences.get(key_download_folder, str(Path.cwd())))
         self.download_folder_input.textChanged[str].connect(lambda value: preferences.set(key_download_folder, value))
@@ -75,8 +102,8 @@ class MainWindow(QMainWindow):
         clipboard = QApplication.clipboard()
 
         maybe_url = clipboard.text(mode=clipboard.Mode.Clipboard)
-        if VIDEO_URL_REGEX.match(maybe_url):
-            self.url_input.setText(maybe_url)
+        if get_video_ids(maybe_url):
+            self.url_input.setPlainText(maybe_url)
             self.url_input.selectAll()
 
     def _setup_ui(self) -> None:
@@ -90,10 +117,10 @@ class MainWindow(QMainWindow):
 
         input_form = QFormLayout()
 
-        self.url_input = QLineEdit()
-        self.url_input.setValidator(QRegularExpressionValidator(QRegularExpression(VIDEO_URL_REGEX_STR)))
-        self.url_input.textChanged[str].connect(self.url_text_changed)
-        input_form.addRow('URL', self.url_input)
+        self.url_input = QPlainTextEdit()
+        self.url_input.setPlaceholderText('One URL per line')
+        self.url_input.textChanged.connect(self.url_text_changed)
+        input_form.addRow('URLs', self.url_input)
 
         folder_input_widget = QWidget()
         folder_input_layout = QHBoxLayout(folder_input_widget)
@@ -113,6 +140,7 @@ class MainWindow(QMainWindow):
         self.status_label = QLabel('Status')
         self.status_label.setAlignment(Qt.AlignmentFlag.AlignHCenter)
         self.status_changed[str].connect(self.status_label.setText)
+        self.files_downloaded[list].connect(show_files_in_explorer)
         root_layout.addWidget(self.status_label)
 
         self.download_button = QPushButton('Download')
@@ -139,23 +167,29 @@ class MainWindow(QMainWindow):
         if self.url_input.isEnabled() \
                 and QApplication.keyboardModifiers() == Qt.KeyboardModifier.ControlModifier \
                 and event.key() == Qt.Key.Key_V:
-            self.url_input.setText(QApplication.clipboard().text())
+            self.url_input.appendPlainText(QApplication.clipboard().text())
             event.accept()
             return
 
     @Slot()
     def reset_status(self) -> None:
-        self.url_text_changed(self.url_input.text())
+        self._url_validation_timer.stop()
+        self.validate_urls()
 
-    @Slot(str)
-    def url_text_changed(self, url: str) -> None:
-        self.video_id = get_video_id(url)
-        can_download = self.video_id is not None
+    @Slot()
+    def url_text_changed(self) -> None:
+        self._url_validation_timer.start()
+
+    @Slot()
+    def validate_urls(self) -> None:
+        urls = self.url_input.toPlainText()
+        self.video_ids = get_video_ids(urls)
+        can_download = bool(self.video_ids)
 
         self.download_button.setEnabled(can_download)
 
-        status = f'Can download' if can_download \
-            else 'No URL' if not url or url.isspace() \
+        status = f'Can download {len(self.video_ids)} video(s)' if can_download \
+            else 'No URL' if not urls or urls.isspace() \
             else 'Invalid URL'
         self.status_label.setText(status)
 
@@ -174,25 +208,41 @@ class MainWindow(QMainWindow):
 
     @Slot()
     def download_button_pressed(self) -> None:
+        if self._url_validation_timer.isActive():
+            self.reset_status()
+
+        if not self.video_ids:
+            return
+
         self._set_input_enabled(enabled=False)
 
+        concurrent_fragments = get_concurrent_fragments(
+            self._preferences.get(self.KEY_CONCURRENT_FRAGMENTS, default=None)
+        )
+
         def download_and_show_file() -> None:
-            mp3_path = download(
-                video_id=self.video_id,
-                download_folder=Path(self.download_folder_input.text()),
-                status_changed=lambda new_status: self.status_changed[str].emit(new_status)
-            )
-            show_file_in_explorer(mp3_path)
+            try:
+                mp3_paths = download_many(
+                    video_ids=self.video_ids,
+                    download_folder=Path(self.download_folder_input.text()),
+                    status_changed=lambda new_status: self.status_changed[str].emit(new_status),
+                    concurrent_fragments=concurrent_fragments
+                )
+            except DownloadBatchError as e:
+                if e.mp3_paths:
+                    self.files_downloaded[list].emit(e.mp3_paths)
+                raise
+
+            self.files_downloaded[list].emit(mp3_paths)
 
         worker = BackgroundWorker(target=download_and_show_file)
 
         worker.progress.finished[Exception].connect(self.download_failed)
-        worker.progress.finished[Exception].connect(self.reset_status)
         worker.progress.finished[Exception].connect(self.enable_input)
 
         worker.progress.finished.connect(self.enable_input)
 
-        QThreadPool.globalInstance().start(worker)
+        self._download_pool.start(worker)
 
     @Slot(Exception)
     def download_failed(self, e: Exception) -> None:
@@ -207,16 +257,19 @@ class MainWindow(QMainWindow):
         self.url_input.selectAll()
 
 
+THEMES = (
+    'light_teal.xml',
+    'light_red.xml',
+    'light_purple_500.xml',
+    'light_lightgreen.xml',
+    'light_cyan_500.xml',
+    'light_blue.xml',
+)
+
+
 def apply_random_theme(app: QApplication) -> None:
-    themes = [
-        'light_teal.xml',
-        'light_red.xml',
-        'light_purple_500.xml',
-        'light_lightgreen.xml',
-        'light_cyan_500.xml',
-        'light_blue.xml',
-    ]
-    theme_name = random.choice(list(set(themes).intersection(set(qt_material.list_themes()))))
+    available_themes = frozenset(qt_material.list_themes())
+    theme_name = random.choice(tuple(theme for theme in THEMES if theme in available_themes))
     qt_material.apply_stylesheet(
         app=app,
         theme=theme_name,
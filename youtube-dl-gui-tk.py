@@ -9,7 +9,7 @@ from typing import Callable, Any
 
 import sv_ttk
 
-from core import detect_missing_commands, get_video_id, download
+from core import detect_missing_commands, get_concurrent_fragments, get_video_ids, download_many
 from preferences import Preferences
 
 
@@ -33,7 +33,7 @@ class BackgroundTask:
                 op()
             except Exception as exception:
                 on_completed(exception)
-            finally:
+            else:
                 on_completed(None)
 
         self._thread = Thread(target=run)
@@ -59,26 +59,25 @@ def bind(preferences: Preferences, variable: tk.Variable, key: str) -> None:
 class MainWindow(ttk.Frame):
     CONFIG_PATH = Path('preferences.json')
     CONFIG_DOWNLOAD_FOLDER = 'download_folder'
+    CONFIG_CONCURRENT_FRAGMENTS = 'concurrent_fragments'
     ENTRY_WIDTH = 50
+    URLS_HEIGHT = 5
+    URL_VALIDATION_DELAY_MS = 100
 
     def __init__(self, *args, **kwargs) -> None:
         super().__init__(*args, **kwargs)
 
         self._config = Preferences(self.CONFIG_PATH)
 
-        self.url = tk.StringVar()
-        self.url.trace_add(mode='write', callback=self._url_changed)
-
         self.status = tk.StringVar()
 
         self.download_folder = tk.StringVar()
 
-        self.video_id: str | None = None
+        self.video_ids: list[str] = []
+        self._url_validation_job: str | None = None
 
         self._populate()
-
-        self.url.set(value='')
-        self.status.set(value='No URL')
+        self._validate_urls()
 
         bind(self._config, self.download_folder, self.CONFIG_DOWNLOAD_FOLDER)
 
@@ -87,8 +86,10 @@ class MainWindow(ttk.Frame):
         self.grid_columnconfigure(index=1, weight=1)
 
         row = iter(range(1_000))
-        ttk.Label(self, text='Video URL').grid(row=next(row), column=0, columnspan=2, sticky=tk.W)
-        ttk.Entry(self, textvariable=self.url, width=self.ENTRY_WIDTH).grid(row=next(row), column=0, columnspan=2)
+        ttk.Label(self, text='Video URLs (one per line)').grid(row=next(row), column=0, columnspan=2, sticky=tk.W)
+        self.url_input = tk.Text(self, width=self.ENTRY_WIDTH, height=self.URLS_HEIGHT)
+        self.url_input.bind('<<Modified>>', self._url_changed)
+        self.url_input.grid(row=next(row), column=0, columnspan=2, sticky=tk.EW)
 
         ttk.Label(self, text='Download folder').grid(row=next(row), column=0, columnspan=2, sticky=tk.W)
         current_row = next(row)
@@ -108,14 +109,32 @@ class MainWindow(ttk.Frame):
     def _toggle_input(self, enabled: bool) -> None:
         state = tk.NORMAL if enabled else tk.DISABLED
         for child in self.children.values():
-            if isinstance(child, (ttk.Button, ttk.Entry)):
+            if isinstance(child, (ttk.Button, ttk.Entry, tk.Text)):
                 child.config(state=state)
 
     def _url_changed(self, *_) -> None:
-        self.video_id = get_video_id(self.url.get())
-
-        self.download_button.config(state=tk.NORMAL if self.video_id is not None else tk.DISABLED)
-        self.status.set(value='Can download' if self.video_id is not None else 'Invalid URL')
+        if not self.url_input.edit_modified():
+            return
+        self.url_input.edit_modified(False)
+
+        if self._url_validation_job is not None:
+            self.after_cancel(self._url_validation_job)
+        self._url_validation_job = self.after(self.URL_VALIDATION_DELAY_MS, self._validate_urls)
+
+    def _validate_urls(self) -> None:
+        if self._url_validation_job is not None:
+            self.after_cancel(self._url_validation_job)
+            self._url_validation_job = None
+
+        urls = self.url_input.get('1.0', tk.END)
+        self.video_ids = get_video_ids(urls)
+
+        self.download_button.config(state=tk.NORMAL if self.video_ids else tk.DISABLED)
+        self.status.set(
+            value=f'Can download {len(self.video_ids)} video(s)' if self.video_ids
+            else 'No URL' if urls.isspace()
+            else 'Invalid URL'
+        )
 
     def _download_folder_changed(self, *_) -> None:
         self._config.set(self.CONFIG_DOWNLOAD_FOLDER, value=self.download_folder.get())
@@ -130,13 +149,24 @@ class MainWindow(ttk.Frame):
         )
 
     def _download_pressed(self, *_) -> None:
+        if self._url_validation_job is not None:
+            self._validate_urls()
+
+        if not self.video_ids:
+            return
+
         self._toggle_input(enabled=False)
 
+        concurrent_fragments = get_concurrent_fragments(
+            self._config.get(self.CONFIG_CONCURRENT_FRAGMENTS, default=None)
+        )
+
         BackgroundTask(
-            op=lambda: download(
-                video_id=self.video_id,
+            op=lambda: download_many(
+                video_ids=self.video_ids,
                 download_folder=Path(self.download_folder.get()),
-                status_changed=self._status_changed
+                status_changed=self._status_changed,
+                concurrent_fragments=concurrent_fragments
             ),
             on_completed=self._download_completed
         ).start()
@@ -147,7 +177,10 @@ class MainWindow(ttk.Frame):
     def _download_completed(self, exception: Exception | None) -> None:
         if exception is not None:
             showerror(title='Error occurred', message=str(exception))
-            self.status.set(value='Error')
+
+            # For a batch keep the per-video statuses, they show which videos failed
+            if 1 == len(self.video_ids):
+                self.status.set(value='Error')
 
         self._toggle_input(enabled=True)
 